@@ -1,8 +1,16 @@
+import os
+import pickle
+import tempfile
+import time
 import streamlit as st
 import yfinance as yf
 import pandas as pd
+import numpy as np
+from numba import njit
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from concurrent.futures import ThreadPoolExecutor
+from pyarrow import feather
 
 #Dashboard Configuration
 st.set_page_config(page_title="Investment Dashboard", layout="wide")
@@ -19,17 +27,9 @@ tickers = {
     "Nebius Group N.V": "NBIS",
 }
 
-#Sidebar for User Input
-st.sidebar.header("Select a Stock")
-selected_stock_name = st.sidebar.selectbox("Choose from your portfolio:", list(tickers.keys()))
-selected_ticker = tickers[selected_stock_name]
-
-# Add date range selector to sidebar
-date_range = st.sidebar.selectbox(
-    "Select Date Range",
-    ["1 Month", "3 Months", "6 Months", "1 Year", "2 Years", "5 Years"],
-    index=3  # Default to 1 Year
-)
+# Hashable (name, ticker) pairs used as the cache key by every portfolio-level
+# function, so they all share entries. Kept in portfolio order for display.
+PORTFOLIO = tuple(tickers.items())
 
 # Map to yfinance periods
 range_map = {
@@ -41,23 +41,345 @@ range_map = {
     "5 Years": "5y"
 }
 
+# Length of each period in days, used to slice the cached 5-year history
+period_days = {
+    "1mo": 30,
+    "3mo": 91,
+    "6mo": 182,
+    "1y": 365,
+    "2y": 730,
+    "5y": 1826
+}
+
+# --- Disk Cache ---
+# Fetch results are also kept on disk so an app restart doesn't refetch everything
+CACHE_DIR = "yf_cache"
+# The cache layers stack, since each one keeps an entry for its full TTL after
+# filling it from the layer below. Worst-case age of what's shown:
+#   disk (30 min) + fetchers' st.cache_data (60 min)          = 90 minutes
+#   + DERIVED_TTL on tables, figures and markdown (10 min)    = 100 minutes
+CACHE_TTL = 1800
+DERIVED_TTL = 600
+
+def disk_cached(key, fetch):
+    # DataFrames are stored as Feather (columnar Arrow buffers), anything else is pickled
+    base = os.path.join(CACHE_DIR, key)
+    for path in (f"{base}.feather", f"{base}.pkl"):
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < CACHE_TTL:
+            if path.endswith('.feather'):
+                return feather.read_feather(path)
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+    
+    data = fetch()
+    # yfinance signals failure with an empty frame, {} or None; don't persist those
+    # so a restart retries the fetch
+    if data is None or (data.empty if isinstance(data, pd.DataFrame) else not data):
+        return data
+    
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write to a temp file first so a concurrent reader never sees a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    try:
+        if isinstance(data, pd.DataFrame):
+            path = f"{base}.feather"
+            os.close(fd)
+            feather.write_feather(data, tmp_path)
+        else:
+            path = f"{base}.pkl"
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        # The disk copy is only an optimization; serve the fetched data regardless
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return data
+
 # --- Caching for Performance ---
+@st.cache_resource(ttl=3600)
+def _ticker(symbol):
+    # One Ticker object per symbol, shared by all fetchers. yfinance memoizes
+    # .info and .news on the object, so it must expire along with those caches
+    return yf.Ticker(symbol)
+
 @st.cache_data(ttl=3600)  # Cache for 1 hour
+def get_stock_data_max(ticker):
+    # Fetch the longest range once; shorter ranges are sliced from it
+    return disk_cached(f"history_{ticker}", lambda: _ticker(ticker).history(period='5y'))
+
+def slice_period(data, period):
+    # yfinance returns an empty frame with a plain Index on failure; pass it through
+    if data.empty or not isinstance(data.index, pd.DatetimeIndex):
+        return data
+    cutoff = pd.Timestamp.now(tz=data.index.tz) - pd.Timedelta(days=period_days[period])
+    return data.loc[data.index >= cutoff]
+
 def get_stock_data(ticker, period):
-    return yf.Ticker(ticker).history(period=period)
+    return slice_period(get_stock_data_max(ticker), period)
 
 @st.cache_data(ttl=3600)
 def get_company_info(ticker):
-    return yf.Ticker(ticker).info
+    return disk_cached(f"info_{ticker}", lambda: _ticker(ticker).info)
 
 @st.cache_data(ttl=3600)
 def get_company_news(ticker):
-    return yf.Ticker(ticker).news
+    return disk_cached(f"news_{ticker}", lambda: _ticker(ticker).news)
 
-# --- Main Content Area with Tabs ---
-tab1, tab2 = st.tabs(["Single Stock Analysis", "Portfolio Summary"])
+@st.cache_data(ttl=3600)
+def get_bulk_history(portfolio):
+    # One batched request for all tickers instead of one per ticker
+    symbols = [ticker for _, ticker in portfolio]
+    return disk_cached(
+        "bulk_" + "_".join(symbols),
+        lambda: yf.download(symbols, period='5y', group_by='ticker', threads=True, progress=False)
+    )
 
-with tab1:
+# Warm the caches for every ticker once per session, in parallel. The bulk
+# download overlaps the per-ticker histories, but the Portfolio tab needs it in
+# this same run, so fetching it alongside beats fetching it serially afterwards
+if 'warm' not in st.session_state:
+    with ThreadPoolExecutor(max_workers=len(tickers) + 1) as ex:
+        ex.submit(get_bulk_history, PORTFOLIO)
+        for ticker in tickers.values():
+            ex.submit(get_stock_data_max, ticker)
+            ex.submit(get_company_info, ticker)
+    st.session_state['warm'] = True
+
+# --- Technical Indicators ---
+@njit(cache=True)
+def _tech(close):
+    # SMA 20, SMA 50 and Wilder's 14-period RSI in a single pass over `close`.
+    # NaN closes are handled like pandas rolling(...).mean() and
+    # ewm(alpha=1/14, adjust=False, min_periods=14).mean()
+    n = close.shape[0]
+    sma20 = np.full(n, np.nan)
+    sma50 = np.full(n, np.nan)
+    rsi = np.full(n, np.nan)
+    alpha = 1.0 / 14
+    sum20 = 0.0
+    sum50 = 0.0
+    nan20 = 0  # NaN closes currently inside each window
+    nan50 = 0
+    avg_up = 0.0
+    avg_dn = 0.0
+    weight = 1.0  # Weight of the running averages, decayed across NaN deltas
+    nobs = 0
+    
+    for i in range(n):
+        if np.isnan(close[i]):
+            nan20 += 1
+            nan50 += 1
+        else:
+            sum20 += close[i]
+            sum50 += close[i]
+        if i >= 20:
+            if np.isnan(close[i - 20]):
+                nan20 -= 1
+            else:
+                sum20 -= close[i - 20]
+        if i >= 50:
+            if np.isnan(close[i - 50]):
+                nan50 -= 1
+            else:
+                sum50 -= close[i - 50]
+        if i >= 19 and nan20 == 0:
+            sma20[i] = sum20 / 20
+        if i >= 49 and nan50 == 0:
+            sma50[i] = sum50 / 50
+        
+        if i == 0:
+            continue
+        if nobs > 0:
+            weight *= 1 - alpha
+        delta = close[i] - close[i - 1]
+        if not np.isnan(delta):
+            up = delta if delta > 0 else 0.0
+            dn = -delta if delta < 0 else 0.0
+            if nobs == 0:
+                avg_up = up
+                avg_dn = dn
+            else:
+                avg_up = (weight * avg_up + alpha * up) / (weight + alpha)
+                avg_dn = (weight * avg_dn + alpha * dn) / (weight + alpha)
+            weight = 1.0
+            nobs += 1
+        if nobs >= 14:
+            if avg_dn > 0:
+                rsi[i] = 100 - 100 / (1 + avg_up / avg_dn)
+            elif avg_up > 0:
+                rsi[i] = 100.0
+    
+    return sma20, sma50, rsi
+
+# --- Chart Helpers ---
+def downsample(data, column='Close', threshold=500):
+    # Largest-Triangle-Three-Buckets on `column`: keep the rows that best
+    # preserve the line's shape so long ranges ship at most `threshold` points
+    data = data.dropna(subset=[column])
+    n = len(data)
+    if n <= threshold:
+        return data
+    
+    x = data.index.asi8.astype(np.float64)
+    y = data[column].to_numpy(np.float64)
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    
+    return data.iloc[keep]
+
+# --- Portfolio Summary ---
+@st.cache_data(ttl=DERIVED_TTL)
+def build_portfolio_table(portfolio):
+    names = [name for name, _ in portfolio]
+    tickers_list = [ticker for _, ticker in portfolio]
+    bulk_data = get_bulk_history(portfolio)
+    
+    # Close prices as one column per ticker; failed tickers become all-NaN columns
+    try:
+        close = bulk_data.xs('Close', axis=1, level=1).reindex(columns=tickers_list)
+    except (KeyError, TypeError):
+        close = pd.DataFrame(columns=tickers_list)
+    
+    if close.empty:
+        return pd.DataFrame({
+            'Name': names,
+            'Ticker': tickers_list,
+            'Price': np.nan,
+            'Change (%)': np.nan,
+            'Last Updated': 'N/A'
+        })
+    
+    # Last two valid closes per ticker, skipping gaps; a single valid row means no change
+    valid = close.notna()
+    filled = close.ffill()
+    current_price = filled.iloc[-1]
+    prev_close = filled.shift().where(valid).ffill().iloc[-1].fillna(current_price)
+    change = ((current_price - prev_close) / prev_close) * 100
+    last_updated = valid.iloc[::-1].idxmax().where(valid.any())
+    
+    return pd.DataFrame({
+        'Name': names,
+        'Ticker': tickers_list,
+        'Price': current_price.to_numpy(),
+        'Change (%)': change.to_numpy(),
+        'Last Updated': pd.to_datetime(last_updated).dt.strftime('%Y-%m-%d').fillna('N/A').to_numpy()
+    })
+
+@st.cache_data(ttl=DERIVED_TTL)
+def build_perf_figure(portfolio):
+    # Get 1-month performance for all tickers
+    bulk_data = get_bulk_history(portfolio)
+    monthly_data = slice_period(bulk_data, '1mo')
+    perf_data = []
+    for _, ticker in portfolio:
+        try:
+            data = monthly_data[ticker]['Close'].dropna()
+            if not data.empty and len(data) > 1:
+                perf = ((data.iloc[-1] - data.iloc[0]) / data.iloc[0]) * 100
+                perf_data.append({
+                    'Ticker': ticker,
+                    'Performance (%)': perf
+                })
+        except (KeyError, IndexError):
+            pass
+    
+    if not perf_data:
+        return None
+    
+    perf_df = pd.DataFrame(perf_data)
+    fig = go.Figure()
+    
+    # Add bars with color based on performance
+    fig.add_trace(go.Bar(
+        x=perf_df['Ticker'],
+        y=perf_df['Performance (%)'],
+        marker_color=['green' if x >= 0 else 'red' for x in perf_df['Performance (%)']],
+        text=perf_df['Performance (%)'].round(2).astype(str) + '%',
+        textposition='auto'
+    ))
+    
+    fig.update_layout(
+        title='1-Month Performance',
+        yaxis_title='Performance (%)',
+        xaxis_title='Ticker',
+        showlegend=False
+    )
+    
+    return fig
+
+# --- Company Profile and News ---
+@st.cache_data(ttl=DERIVED_TTL)
+def render_profile_md(ticker):
+    # Returns the profile/metrics markdown and the business summary, formatted once per hour
+    info = get_company_info(ticker)
+    
+    # Display key info points
+    lines = [
+        f"**Sector:** {info.get('sector', 'N/A')}",
+        f"**Industry:** {info.get('industry', 'N/A')}",
+        f"**Website:** {info.get('website', 'N/A')}",
+        f"**Market Cap:** ${info.get('marketCap', 0):,}",
+        "---",
+        "### Key Metrics"
+    ]
+    
+    # Key metrics section
+    metrics = {
+        'P/E Ratio': info.get('trailingPE'),
+        'P/B Ratio': info.get('priceToBook'),
+        'Dividend Yield': info.get('dividendYield'),
+        '52 Week High': info.get('fiftyTwoWeekHigh'),
+        '52 Week Low': info.get('fiftyTwoWeekLow')
+    }
+    
+    for metric, value in metrics.items():
+        if value is not None:
+            lines.append(f"**{metric}:** {value:.2f}" if isinstance(value, float) else f"**{metric}:** {value}")
+    
+    lines += ["---", "**Business Summary:**"]
+    
+    return "\n\n".join(lines), info.get('longBusinessSummary', 'No summary available.')
+
+@st.cache_data(ttl=DERIVED_TTL)
+def render_news_md(ticker):
+    # Returns (title, markdown) pairs for the top 5 articles
+    news = get_company_news(ticker)
+    items = []
+    for item in (news or [])[:5]:
+        lines = [f"**Publisher:** {item['publisher']}"]
+        if 'providerPublishTime' in item:
+            lines.append(f"**Published:** {pd.to_datetime(item['providerPublishTime'], unit='s').strftime('%Y-%m-%d %H:%M')}")
+        lines.append(f"[Read more]({item['link']})")
+        items.append((item['title'], "\n\n".join(lines)))
+    return items
+
+# --- Main Content Area with Tabs ---
+@st.fragment
+def render_stock_analysis():
+    # Selectors live inside the fragment so changing them only reruns this tab
+    col_stock, col_range = st.columns(2)
+    selected_stock_name = col_stock.selectbox("Choose from your portfolio:", list(tickers.keys()))
+    selected_ticker = tickers[selected_stock_name]
+    
+    date_range = col_range.selectbox(
+        "Select Date Range",
+        ["1 Month", "3 Months", "6 Months", "1 Year", "2 Years", "5 Years"],
+        index=3  # Default to 1 Year
+    )
+    
     st.header(f"Displaying data for: {selected_stock_name} ({selected_ticker})")
 
     # --- Fetch and Display Price Chart ---
@@ -67,51 +389,59 @@ with tab1:
         hist_data = get_stock_data(selected_ticker, range_map[date_range])
         
         if not hist_data.empty:
-            # Calculate Simple Moving Averages
-            hist_data['SMA_20'] = hist_data['Close'].rolling(window=20).mean()
-            hist_data['SMA_50'] = hist_data['Close'].rolling(window=50).mean()
+            # Single precision is plenty for display and halves the chart payload
+            hist_data = hist_data.astype({'Open': 'float32', 'High': 'float32', 'Low': 'float32', 'Close': 'float32'})
+            
+            # Calculate Simple Moving Averages and RSI (Wilder's smoothing)
+            sma20, sma50, rsi = _tech(hist_data['Close'].to_numpy(np.float64))
+            hist_data['SMA_20'] = sma20.astype(np.float32)
+            hist_data['SMA_50'] = sma50.astype(np.float32)
+            hist_data['RSI'] = rsi.astype(np.float32)
             
-            # Calculate RSI
-            delta = hist_data['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            hist_data['RSI'] = 100 - (100 / (1 + rs))
+            # Indicators are computed at full resolution; only the plotted rows are thinned
+            chart_data = downsample(hist_data)
+            
+            # Convert the shared x-axis once (local dates, tz dropped) and reuse it for every trace
+            x_arr = chart_data.index.tz_localize(None).values
+            y_close = chart_data['Close'].to_numpy()
+            y_sma20 = chart_data['SMA_20'].to_numpy()
+            y_sma50 = chart_data['SMA_50'].to_numpy()
+            y_rsi = chart_data['RSI'].to_numpy()
             
             # Create a Plotly figure with subplots
             fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1, 
                               subplot_titles=('Price with Moving Averages', 'RSI'))
             
             # Add the main closing price line
-            fig.add_trace(go.Scatter(
-                x=hist_data.index, 
-                y=hist_data['Close'], 
+            fig.add_trace(go.Scattergl(
+                x=x_arr, 
+                y=y_close, 
                 mode='lines', 
                 name='Close Price',
                 line=dict(color='#1f77b4')
             ), row=1, col=1)
             
             # Add the moving averages
-            fig.add_trace(go.Scatter(
-                x=hist_data.index, 
-                y=hist_data['SMA_20'], 
+            fig.add_trace(go.Scattergl(
+                x=x_arr, 
+                y=y_sma20, 
                 mode='lines', 
                 name='20-Day SMA', 
                 line=dict(dash='dot', color='#ff7f0e')
             ), row=1, col=1)
             
-            fig.add_trace(go.Scatter(
-                x=hist_data.index, 
-                y=hist_data['SMA_50'], 
+            fig.add_trace(go.Scattergl(
+                x=x_arr, 
+                y=y_sma50, 
                 mode='lines', 
                 name='50-Day SMA', 
                 line=dict(dash='dash', color='#2ca02c')
             ), row=1, col=1)
             
             # Add RSI chart
-            fig.add_trace(go.Scatter(
-                x=hist_data.index, 
-                y=hist_data['RSI'], 
+            fig.add_trace(go.Scattergl(
+                x=x_arr, 
+                y=y_rsi, 
                 name='RSI',
                 line=dict(color='#9467bd')
             ), row=2, col=1)
@@ -137,32 +467,9 @@ with tab1:
     with col1:
         st.subheader("Company Profile")
         try:
-            info = get_company_info(selected_ticker)
-            
-            # Display key info points
-            st.write(f"**Sector:** {info.get('sector', 'N/A')}")
-            st.write(f"**Industry:** {info.get('industry', 'N/A')}")
-            st.write(f"**Website:** {info.get('website', 'N/A')}")
-            st.write(f"**Market Cap:** ${info.get('marketCap', 0):,}")
-            
-            # Key metrics section
-            st.markdown("---")
-            st.subheader("Key Metrics")
-            metrics = {
-                'P/E Ratio': info.get('trailingPE'),
-                'P/B Ratio': info.get('priceToBook'),
-                'Dividend Yield': info.get('dividendYield'),
-                '52 Week High': info.get('fiftyTwoWeekHigh'),
-                '52 Week Low': info.get('fiftyTwoWeekLow')
-            }
-            
-            for metric, value in metrics.items():
-                if value is not None:
-                    st.write(f"**{metric}:** {value:.2f}" if isinstance(value, float) else f"**{metric}:** {value}")
-            
-            st.markdown("---")
-            st.write("**Business Summary:**")
-            st.info(info.get('longBusinessSummary', 'No summary available.'))
+            profile_md, summary = render_profile_md(selected_ticker)
+            st.markdown(profile_md)
+            st.info(summary)
             
         except Exception as e:
             st.error(f"Could not retrieve company information. Error: {e}")
@@ -170,112 +477,52 @@ with tab1:
     with col2:
         st.subheader("Recent News")
         try:
-            news = get_company_news(selected_ticker)
+            news = render_news_md(selected_ticker)
             if news:
-                for item in news[:5]:  # Display top 5 articles
-                    with st.expander(item['title']):
-                        st.write(f"**Publisher:** {item['publisher']}")
-                        if 'providerPublishTime' in item:
-                            st.write(f"**Published:** {pd.to_datetime(item['providerPublishTime'], unit='s').strftime('%Y-%m-%d %H:%M')}")
-                        st.write(f"[Read more]({item['link']})")
+                for title, news_md in news:
+                    with st.expander(title):
+                        st.markdown(news_md)
             else:
                 st.info("No recent news found for this company.")
         except Exception as e:
             st.warning("News feed temporarily unavailable.")
 
-with tab2:
+@st.fragment
+def render_portfolio():
     st.subheader("Portfolio Overview")
     
     # Fetch data for all tickers
-    portfolio_data = []
-    for name, ticker in tickers.items():
-        try:
-            data = get_stock_data(ticker, '1d')['Close']
-            if not data.empty:
-                current_price = data.iloc[-1]
-                prev_close = data.iloc[-2] if len(data) > 1 else current_price
-                change = ((current_price - prev_close) / prev_close) * 100
-                
-                portfolio_data.append({
-                    'Name': name,
-                    'Ticker': ticker,
-                    'Price': current_price,
-                    'Change (%)': change,
-                    'Last Updated': data.index[-1].strftime('%Y-%m-%d')
-                })
-            else:
-                portfolio_data.append({
-                    'Name': name,
-                    'Ticker': ticker,
-                    'Price': 'N/A',
-                    'Change (%)': 'N/A',
-                    'Last Updated': 'N/A'
-                })
-        except:
-            portfolio_data.append({
-                'Name': name,
-                'Ticker': ticker,
-                'Price': 'N/A',
-                'Change (%)': 'N/A',
-                'Last Updated': 'N/A'
-            })
-    
-    df = pd.DataFrame(portfolio_data)
-    
-    # Apply color formatting to change percentage
-    def color_change(val):
-        if isinstance(val, (int, float)):
-            color = 'red' if val < 0 else 'green'
-            return f'color: {color}'
-        return ''
+    df = build_portfolio_table(PORTFOLIO)
+    
+    # Apply color formatting to change percentage, one call for the whole column
+    def color_change(col):
+        nums = pd.to_numeric(col, errors='coerce')
+        return np.where(nums < 0, 'color: red', np.where(nums >= 0, 'color: green', ''))
     
     styled_df = df.style.format({
         'Price': '{:.2f}',
         'Change (%)': '{:.2f}%'
-    }).applymap(color_change, subset=['Change (%)'])
+    }, na_rep='N/A').apply(color_change, subset=['Change (%)'])
     
-    st.dataframe(styled_df, use_container_width=True, height=(len(df) + 1) * 35 + 3)
+    st.dataframe(styled_df, use_container_width=True, height=280)
     
     # Add a simple portfolio performance chart
     st.subheader("Portfolio Performance")
     
     try:
-        # Get 1-month performance for all tickers
-        perf_data = []
-        for name, ticker in tickers.items():
-            try:
-                data = get_stock_data(ticker, '1mo')['Close']
-                if not data.empty and len(data) > 1:
-                    perf = ((data.iloc[-1] - data.iloc[0]) / data.iloc[0]) * 100
-                    perf_data.append({
-                        'Ticker': ticker,
-                        'Performance (%)': perf
-                    })
-            except:
-                pass
+        fig = build_perf_figure(PORTFOLIO)
         
-        if perf_data:
-            perf_df = pd.DataFrame(perf_data)
-            fig = go.Figure()
-            
-            # Add bars with color based on performance
-            fig.add_trace(go.Bar(
-                x=perf_df['Ticker'],
-                y=perf_df['Performance (%)'],
-                marker_color=['green' if x >= 0 else 'red' for x in perf_df['Performance (%)']],
-                text=perf_df['Performance (%)'].round(2).astype(str) + '%',
-                textposition='auto'
-            ))
-            
-            fig.update_layout(
-                title='1-Month Performance',
-                yaxis_title='Performance (%)',
-                xaxis_title='Ticker',
-                showlegend=False
-            )
-            
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Could not load performance data for all stocks.")
     except Exception as e:
-        st.warning(f"Failed to generate performance chart: {e}")
\ No newline at end of file
+        st.warning(f"Failed to generate performance chart: {e}")
+
+tab1, tab2 = st.tabs(["Single Stock Analysis", "Portfolio Summary"])
+
+with tab1:
+    render_stock_analysis()
+
+with tab2:
+    render_portfolio()
\ No newline at end of file